@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "combinefrontend.py")
+OUTPUT_NAME = "combined_frontend.txt"
+MARKER_NAME = ".benchfrontend" # Written by generate_tree; only marked trees are reused or modified
+
+# (name, extra command line arguments, preparation): "warm" runs the same
+# command once untimed first, "warm-edit" additionally edits one Dart file
+SCENARIOS = [
+    ("cold-serial", ["-j", "1"], None),
+    ("cold-parallel", [], None),
+    ("incremental-unchanged", ["--incremental"], "warm"),
+    ("incremental-one-edit", ["--incremental"], "warm-edit"),
+    ("dedupe-index", ["--dedupe", "--index"], None),
+]
+
+def _write(path, data):
+    """Writes data (str or bytes) to path, creating parent directories."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data.encode('utf-8') if isinstance(data, str) else data)
+
+def _dart_source(rng, name):
+    """Returns a plausible Dart widget file of a few kilobytes."""
+    fields = "".join(f"  final String field{i};\n" for i in range(rng.randint(2, 8)))
+    methods = "".join(
+        f"  /// Handles step {i}.\n  int step{i}(int value) {{\n"
+        + "".join(f"    value = value * {rng.randint(2, 9)} + {rng.randint(0, 99)};\n" for _ in range(rng.randint(3, 12)))
+        + "    return value;\n  }\n\n"
+        for i in range(rng.randint(3, 15)))
+    return (f"import 'package:flutter/material.dart';\n\n/// {name} screen.\nclass {name} extends StatelessWidget {{\n"
+            f"{fields}\n  const {name}({{super.key}});\n\n{methods}"
+            "  @override\n  Widget build(BuildContext context) {\n    return const Placeholder();\n  }\n}\n")
+
+def _png(rng, width, height, size):
+    """Returns a PNG header for width x height padded with random bytes to size."""
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    chunk = struct.pack('>I', len(ihdr)) + b'IHDR' + ihdr + struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    header = b'\x89PNG\r\n\x1a\n' + chunk
+    return header + rng.randbytes(max(0, size - len(header)))
+
+def generate_tree(root, dart_files=2000, pods_files=5000, build_files=3000, assets=50, asset_size=512 * 1024, seed=0):
+    """Generates a synthetic Flutter-like project under root.
+
+       Besides lib/ and test/ sources it contains the directories real
+       checkouts accumulate: a deep ios/Pods tree, build/ outputs,
+       .dart_tool and a .venv, plus large PNG assets and duplicated
+       platform Contents.json files."""
+    rng = random.Random(seed)
+    _write(os.path.join(root, MARKER_NAME), "Generated by benchfrontend.py; safe to delete.\n")
+    _write(os.path.join(root, "pubspec.yaml"), "name: bench_app\nflutter:\n  assets:\n    - assets/images/\n")
+    _write(os.path.join(root, "analysis_options.yaml"), "include: package:flutter_lints/flutter.yaml\n")
+    _write(os.path.join(root, ".gitignore"), ".dart_tool/\nbuild/\n.venv/\n")
+    _write(os.path.join(root, "ios", ".gitignore"), "**/Pods/\n")
+
+    for i in range(dart_files):
+        name = f"Screen{i}"
+        folder = "test" if i % 10 == 0 else os.path.join("lib", "features", f"feature{i // 50}")
+        _write(os.path.join(root, folder, f"screen_{i}.dart"), _dart_source(rng, name))
+
+    for i in range(pods_files):
+        depth = [f"level{d}" for d in range(i % 8)]
+        _write(os.path.join(root, "ios", "Pods", f"Pod{i // 100}", "Sources", *depth, f"file_{i}.json"),
+               json.dumps({"pod": i, "payload": "x" * rng.randint(100, 2000)}))
+
+    for i in range(build_files):
+        folder = rng.choice([os.path.join("build", "app", "intermediates"), os.path.join("android", "app", "build", "tmp"),
+                             os.path.join(".dart_tool", "flutter_build"), os.path.join(".venv", "lib", "site-packages", f"pkg{i // 20}")])
+        _write(os.path.join(root, folder, f"out_{i}.txt"), "generated\n" * rng.randint(10, 200))
+
+    for i in range(assets):
+        _write(os.path.join(root, "assets", "images", f"image_{i}.png"), _png(rng, 256 + i, 256 + i, asset_size))
+
+    contents = json.dumps({"images": [{"size": "1024x1024", "idiom": "universal"}], "info": {"version": 1}}, indent=2)
+    for platform in ("ios", "macos"):
+        _write(os.path.join(root, platform, "Runner", "Assets.xcassets", "AppIcon.appiconset", "Contents.json"), contents)
+
+def _clean_outputs(root):
+    """Removes the bundle and every sidecar from a previous scenario."""
+    for name in os.listdir(root):
+        if name.startswith(os.path.splitext(OUTPUT_NAME)[0]):
+            os.remove(os.path.join(root, name))
+
+def _run(root, arguments):
+    """Runs combinefrontend.py with --stats in a fresh process and returns (wall seconds, stats)."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, SCRIPT, root, "-o", os.path.join(root, OUTPUT_NAME), "--stats", *arguments],
+                            check=True, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    # Read errors are printed before the JSON document
+    lines = result.stdout.splitlines()
+    return wall, json.loads("\n".join(lines[lines.index("{"):]))
+
+def run_scenarios(root, repeat):
+    """Runs every scenario repeat times and keeps the fastest run of each."""
+    results = {}
+    edit_target = os.path.join(root, "lib", "features", "feature0", "screen_1.dart")
+    for name, arguments, prepare in SCENARIOS:
+        best = None
+        for _ in range(repeat):
+            _clean_outputs(root)
+            if prepare is not None:
+                _run(root, arguments)
+            if prepare == "warm-edit":
+                with open(edit_target, 'a', encoding='utf-8') as f:
+                    f.write("// edited\n")
+            wall, stats = _run(root, arguments)
+            if best is None or stats['total_seconds'] < best['stats']['total_seconds']:
+                best = {'wall_seconds': wall, 'stats': stats}
+        results[name] = best
+    _clean_outputs(root)
+    return results
+
+def _print_table(results):
+    """Prints one line of phase timings per scenario."""
+    phases = list(next(iter(results.values()))['stats']['phases'])
+    print(f"{'scenario':<24}{'total':>9}{'wall':>9}" + "".join(f"{phase:>10}" for phase in phases) + f"{'files':>8}{'MiB out':>9}{'peak MiB':>10}")
+    for name, result in results.items():
+        stats = result['stats']
+        peak = stats['peak_memory_bytes']
+        print(f"{name:<24}{stats['total_seconds']:>9.3f}{result['wall_seconds']:>9.3f}"
+              + "".join(f"{stats['phases'][phase]:>10.3f}" for phase in phases)
+              + f"{stats['files']['text']:>8}{stats['bytes']['written'] / 2**20:>9.1f}"
+              + (f"{peak / 2**20:>10.1f}" if peak is not None else f"{'-':>10}"))
+
+def _check_baseline(results, baseline_file, tolerance):
+    """Returns the scenarios whose total time regressed beyond tolerance."""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['stats']['total_seconds']
+        after = result['stats']['total_seconds']
+        if after > before * (1 + tolerance):
+            regressions.append(f"{name}: {after:.3f}s vs {before:.3f}s baseline")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark combinefrontend.py on a synthetic Flutter-like tree.")
+    parser.add_argument("--dart-files", type=int, default=2000, help="Dart sources under lib/ and test/")
+    parser.add_argument("--pods-files", type=int, default=5000, help="Files in the deep ios/Pods tree")
+    parser.add_argument("--build-files", type=int, default=3000, help="Files in build/, .dart_tool and .venv")
+    parser.add_argument("--assets", type=int, default=50, help="PNG assets under assets/images")
+    parser.add_argument("--asset-size", type=int, default=512 * 1024, help="Size of each asset in bytes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the fastest is reported")
+    parser.add_argument("--tree", help="Generate the tree here and keep it for later runs; must be new, empty or generated earlier (default: a temporary directory)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON, e.g. bench_output.txt")
+    parser.add_argument("--baseline", metavar="FILE", help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against --baseline (default: 0.25)")
+    args = parser.parse_args()
+
+    root = args.tree or tempfile.mkdtemp(prefix="benchfrontend-")
+    # The scenarios delete outputs and edit sources, so never run them on a real checkout
+    if os.path.isdir(root) and os.listdir(root) and not os.path.exists(os.path.join(root, MARKER_NAME)):
+        sys.exit(f"Error: {root} is not empty and was not generated by benchfrontend.py; pass a new or empty directory")
+    try:
+        if not os.path.exists(os.path.join(root, MARKER_NAME)):
+            generate_tree(root, args.dart_files, args.pods_files, args.build_files, args.assets, args.asset_size)
+        results = run_scenarios(root, args.repeat)
+    finally:
+        if args.tree is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'parameters': vars(args), 'results': results}, f, indent=2)
+    if args.baseline:
+        regressions = _check_baseline(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        sys.exit(1 if regressions else 0)
@@ -1,52 +1,1535 @@
-import os
+import argparse
+import contextlib
+import ctypes
+import ctypes.util
+import errno
+import gzip
+import hashlib
+import json
+import mmap
 import mimetypes
+import os
+import re
+import select
+import struct
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_SUFFIX = ".manifest.json" # Sidecar written next to the output file in incremental mode
+MANIFEST_VERSION = 2
+INDEX_SUFFIX = ".index.json" # Byte-offset index of the bundle's sections, written with index=True
+INDEX_VERSION = 2
+SHARDS_SUFFIX = ".shards.json" # Lists which files went into which shard, written with shard_tokens set
+SHARDS_VERSION = 1
+ASSET_CACHE_SUFFIX = ".assets.json" # Probed asset metadata keyed by path, size and mtime
+ASSET_CACHE_VERSION = 1
+ASSET_PROBE_SIZE = 32 # Enough header bytes for PNG, GIF and WebP dimensions
+OUTLINE_CACHE_SUFFIX = ".outline.json" # Dart outlines keyed by mode and source hash
+OUTLINE_CACHE_VERSION = 1
+DART_MODES = ('full', 'outline', 'minified')
+CHUNK_SIZE = 64 * 1024 # Amount of content moved per read when copying sections
+SPOOL_MAX_SIZE = 1024 * 1024 # Decoded files above this size are spooled to disk instead of memory
+DEFAULT_JOBS = min(32, (os.cpu_count() or 1) + 4) # Reader threads; file reads are I/O bound
+# Shard packing priority by .gitignore-style pattern: the first matching
+# pattern decides, lower numbers are packed first, anything else gets DEFAULT_PRIORITY
+SHARD_PRIORITIES = [
+    ('lib/**/*.dart', 0),
+    ('pubspec.yaml', 10),
+    ('test/**/*.dart', 20),
+    ('*.dart', 30),
+    ('analysis_options.yaml', 40),
+    ('**/*.xcassets/**', 90),
+    ('**/Pods/**', 90),
+    ('web/**', 60),
+    ('android/**', 70),
+    ('ios/**', 70),
+    ('macos/**', 70),
+    ('windows/**', 70),
+    ('linux/**', 70),
+]
+DEFAULT_PRIORITY = 50
+ASSETS_PRIORITY = 100 # The asset listing is packed after every file
+_TOKEN_RE = re.compile(rb"[A-Za-z]{1,8}|[0-9]{1,3}|[^\sA-Za-z0-9]")
+# ASCII character classes usable as [:name:] in .gitignore bracket expressions
+_POSIX_CLASSES = {
+    'alnum': 'a-zA-Z0-9', 'alpha': 'a-zA-Z', 'blank': ' \\t', 'cntrl': '\\x00-\\x1f\\x7f',
+    'digit': '0-9', 'graph': '!-~', 'lower': 'a-z', 'print': ' -~', 'punct': re.escape('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~'),
+    'space': ' \\t\\n\\r\\f\\v', 'upper': 'A-Z', 'xdigit': '0-9A-Fa-f',
+}
+# Common Flutter build/cache directories and tooling, in .gitignore syntax
+DEFAULT_EXCLUDES = ['.git', 'build/', '.pub-cache/', '.dart_tool/', 'Pods/', '.venv/', 'venv/', '__pycache__/']
+
+def _section_header(relative_path):
+    """Returns the marker line that introduces a file's content in the bundle."""
+    return f"\n\n--- FILE: {relative_path} ---\n\n"
+
+def _file_key(stat_result):
+    """Returns the (size, mtime) pair used to decide whether a file changed."""
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+def _load_json(json_file, version):
+    """Loads a JSON sidecar, or returns None if it is missing, unreadable or of another version."""
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) and data.get('version') == version else None
+
+def _write_json_atomic(json_file, data):
+    """Writes a JSON sidecar through a temporary file, so readers never see a partial one."""
+    tmp_file = json_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_file, json_file)
+
+def _load_manifest(manifest_file, output_file, options):
+    """Loads the manifest of a previous run, or None if it cannot be trusted.
+
+       The manifest is only usable while the output file it describes is
+       exactly the one that run produced, since sections are reused by offset,
+       and was written with the same content-affecting options."""
+    manifest = _load_json(manifest_file, MANIFEST_VERSION)
+    if manifest is None or manifest.get('options') != options:
+        return None
+    try:
+        output_stat = os.stat(output_file)
+    except OSError:
+        return None
+    if manifest.get('output') != list(_file_key(output_stat)):
+        return None
+    return manifest
+
+def _write_manifest(manifest_file, output_file, sections, files, assets_hash, options):
+    """Records the layout of a freshly written output file.
+
+       files lists [path, size, mtime_ns] of every walked text file, or None
+       where it could not be stat'ed, including those that failed to read and
+       so have no section; a later run compares it to decide nothing changed."""
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'options': options,
+        'output': list(_file_key(os.stat(output_file))),
+        'assets_sha256': assets_hash,
+        'files': files,
+        'sections': sections,
+    }
+    _write_json_atomic(manifest_file, manifest)
+
+def _write_index(index_file, output_file, sections, assets_length):
+    """Writes the byte-offset index of every section in output_file."""
+    bundle_size, bundle_mtime_ns = _file_key(os.stat(output_file))
+    index = {
+        'version': INDEX_VERSION,
+        # Size alone misses rewrites where section lengths changed but cancel out
+        'bundle': [bundle_size, bundle_mtime_ns],
+        'files': [{key: section[key] for key in ('path', 'offset', 'length', 'sha256')} for section in sections],
+        'assets': {'offset': bundle_size - assets_length, 'length': assets_length},
+    }
+    _write_json_atomic(index_file, index)
+
+def _index_is_current(index_file, output_file):
+    """Returns True if index_file was written for the current output_file."""
+    index = _load_json(index_file, INDEX_VERSION)
+    try:
+        return index is not None and index.get('bundle') == list(_file_key(os.stat(output_file)))
+    except OSError:
+        return False
+
+class BundleReader:
+    """Random access to the sections of a bundle written with index=True.
+
+       The bundle is memory-mapped, so listing, extracting or verifying a
+       file only touches the pages of that file's section."""
+
+    def __init__(self, bundle_file, index_file=None):
+        index = _load_json(index_file or bundle_file + INDEX_SUFFIX, INDEX_VERSION)
+        if index is None:
+            raise ValueError(f"No usable index for {bundle_file}; regenerate it with --index")
+        self._file = open(bundle_file, 'rb')
+        try:
+            if list(_file_key(os.fstat(self._file.fileno()))) != index.get('bundle'):
+                raise ValueError(f"Index does not match {bundle_file}; regenerate it")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        self._sections = {section['path']: section for section in index['files']}
+        self._assets = index['assets']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def paths(self):
+        """Returns the bundled paths in bundle order."""
+        return list(self._sections)
+
+    def read(self, path):
+        """Returns the content bytes of path; raises KeyError if it is not bundled."""
+        section = self._sections[path]
+        return self._map[section['offset']:section['offset'] + section['length']]
+
+    def read_assets(self):
+        """Returns the trailing asset listing."""
+        return self._map[self._assets['offset']:self._assets['offset'] + self._assets['length']]
+
+    def verify(self, path):
+        """Returns True if the content of path still matches its recorded hash."""
+        section = self._sections[path]
+        with memoryview(self._map) as view:
+            content = view[section['offset']:section['offset'] + section['length']]
+            try:
+                return hashlib.sha256(content).hexdigest() == section['sha256']
+            finally:
+                content.release()
+
+def estimate_tokens(data):
+    """Estimates the LLM token count of UTF-8 bytes without a tokenizer.
+
+       Counts letter runs in 8-character pieces, digit runs in groups of
+       three and every other non-space byte on its own. That tracks BPE
+       tokenizers on source code and errs on the high side for prose and
+       non-ASCII text, which is the safe direction for a budget."""
+    return len(_TOKEN_RE.findall(data))
+
+def _shard_file(output_file, number):
+    """Returns the path of the numbered shard written for output_file."""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}.shard{number:02d}{ext}"
+
+def _shard_priority(relative_path, priorities):
+    """Returns the packing priority of a bundled path."""
+    path = relative_path.replace(os.sep, '/')
+    for regex, priority in priorities:
+        if regex.fullmatch(path):
+            return priority
+    return DEFAULT_PRIORITY
+
+def _remove_shards(output_file, first=1):
+    """Removes the numbered shards of output_file from shard number first on."""
+    number = first
+    while os.path.exists(_shard_file(output_file, number)):
+        os.remove(_shard_file(output_file, number))
+        number += 1
+
+def _split_lines(content, start, budget, header_tokens):
+    """Splits an oversized section into line-aligned (start, end, tokens) pieces."""
+    pieces = []
+    piece_start = piece_tokens = 0
+    position = 0
+    for line in content.splitlines(keepends=True):
+        tokens = estimate_tokens(line)
+        if position > piece_start and header_tokens + piece_tokens + tokens > budget:
+            pieces.append((start + piece_start, start + position, header_tokens + piece_tokens))
+            piece_start, piece_tokens = position, 0
+        piece_tokens += tokens
+        position += len(line)
+    pieces.append((start + piece_start, start + position, header_tokens + piece_tokens))
+    return pieces
+
+def _shards_are_current(shards_file, output_file, budget):
+    """Returns True if the shards listed in shards_file match output_file and budget."""
+    shards = _load_json(shards_file, SHARDS_VERSION)
+    if shards is None:
+        return False
+    try:
+        return (shards.get('bundle_size') == os.stat(output_file).st_size
+                and shards.get('budget') == budget
+                and all(os.path.exists(os.path.join(os.path.dirname(output_file), shard['file'])) for shard in shards['shards']))
+    except (OSError, KeyError):
+        return False
+
+def _write_shards(shards_file, output_file, sections, assets_length, budget):
+    """Packs the sections of output_file into shards of at most budget tokens.
+
+       Files are ranked by SHARD_PRIORITIES and placed first-fit, so the
+       earliest shards hold the most useful sources and platform boilerplate
+       collects at the end. A file larger than the budget is split at line
+       boundaries into parts that are labelled in their section header."""
+    priorities = [(re.compile(_translate_gitignore(pattern)[0]), priority) for pattern, priority in SHARD_PRIORITIES]
+    with open(output_file, 'rb') as bundle, mmap.mmap(bundle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        # (priority, header, start, end, tokens, entry) for every piece to place
+        pieces = []
+        for section in sections:
+            path = section['path']
+            start, end = section['offset'], section['offset'] + section['length']
+            header = _section_header(path).encode('utf-8')
+            tokens = estimate_tokens(header) + estimate_tokens(data[start:end])
+            priority = _shard_priority(path, priorities)
+            if tokens <= budget:
+                pieces.append((priority, header, start, end, tokens, {'path': path, 'tokens': tokens}))
+                continue
+            part_header_tokens = estimate_tokens(_section_header(f"{path} (part 000/000)").encode('utf-8'))
+            parts = _split_lines(data[start:end], start, budget, part_header_tokens)
+            for number, (part_start, part_end, part_tokens) in enumerate(parts, 1):
+                part_header = _section_header(f"{path} (part {number}/{len(parts)})").encode('utf-8')
+                entry = {'path': path, 'tokens': part_tokens, 'part': [number, len(parts)]}
+                pieces.append((priority, part_header, part_start, part_end, part_tokens, entry))
+        assets_start = len(data) - assets_length
+        assets_tokens = estimate_tokens(data[assets_start:])
+        pieces.append((ASSETS_PRIORITY, b"", assets_start, len(data), assets_tokens, {'assets': True, 'tokens': assets_tokens}))
+
+        shards = []
+        last_shard = {} # Parts of a split file never land before the shard holding the previous part
+        for piece in sorted(pieces, key=lambda piece: piece[0]):
+            tokens, entry = piece[4], piece[5]
+            first = last_shard.get(entry.get('path'), 0)
+            for number in range(first, len(shards)):
+                if shards[number]['tokens'] + tokens <= budget:
+                    break
+            else:
+                number = len(shards)
+                shards.append({'tokens': 0, 'pieces': []})
+            shards[number]['tokens'] += tokens
+            shards[number]['pieces'].append(piece)
+            if 'part' in entry:
+                last_shard[entry['path']] = number
+
+        listing = []
+        for number, shard in enumerate(shards, 1):
+            shard_path = _shard_file(output_file, number)
+            with open(shard_path + ".tmp", 'wb') as outfile:
+                for _, header, start, end, _, _ in shard['pieces']:
+                    outfile.write(header)
+                    outfile.write(data[start:end])
+            os.replace(shard_path + ".tmp", shard_path)
+            over_budget = shard['tokens'] > budget
+            if over_budget:
+                print(f"Warning: {os.path.basename(shard_path)} is over the {budget} token budget ({shard['tokens']} tokens)")
+            listing.append({
+                'file': os.path.basename(shard_path),
+                'tokens': shard['tokens'],
+                'over_budget': over_budget,
+                'files': [piece[5] for piece in shard['pieces']],
+            })
+
+    # Drop shards left over from a previous run that needed more of them
+    _remove_shards(output_file, len(shards) + 1)
+
+    manifest = {
+        'version': SHARDS_VERSION,
+        'bundle_size': os.stat(output_file).st_size,
+        'budget': budget,
+        'shards': listing,
+    }
+    _write_json_atomic(shards_file, manifest)
+
+def _reference_body(first_path):
+    """Returns the body written in place of a section identical to first_path."""
+    return f"--- SAME AS: {first_path} ---\n"
+
+def _compressor(compress):
+    """Returns a function wrapping a binary file in a compressing writer.
+
+       compress is None, 'gzip' or 'zstd'. zstd uses the standard library
+       module where available (Python 3.14+), otherwise the zstandard package."""
+    if compress is None:
+        return contextlib.nullcontext
+    if compress == 'gzip':
+        # A fixed mtime keeps the compressed output reproducible
+        return lambda raw: gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0)
+    if compress == 'zstd':
+        try:
+            from compression import zstd
+            return lambda raw: zstd.ZstdFile(raw, 'wb')
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression needs Python 3.14+ or the zstandard package") from None
+        return lambda raw: zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    raise ValueError(f"Unknown compression: {compress}")
+
+def _jpeg_dimensions(f):
+    """Walks JPEG marker segments up to the first frame header.
+
+       Only segment headers are read; segment bodies (EXIF, ICC profiles,
+       thumbnails) are skipped with seeks. Returns (width, height) or None."""
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte == b'\xff':
+            marker = f.read(1)
+            if marker != b'\xff': # Runs of 0xFF are fill bytes
+                break
+        else:
+            return None
+        if not marker or marker == b'\xd9':
+            return None
+        if marker in (b'\x01', *(bytes([m]) for m in range(0xd0, 0xd8))):
+            continue # Standalone markers carry no length
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack('>H', header)[0]
+        if marker[0] in (0xc0, 0xc1, 0xc2, 0xc3, 0xc5, 0xc6, 0xc7, 0xc9, 0xca, 0xcb, 0xcd, 0xce, 0xcf):
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+def _probe_asset(filepath):
+    """Identifies an asset from its first bytes.
+
+       Returns (mime_type, width, height); mime_type is None when the magic
+       bytes are not recognised and width/height are None when unknown."""
+    with open(filepath, 'rb') as f:
+        head = f.read(ASSET_PROBE_SIZE)
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR' and len(head) >= 24:
+            width, height = struct.unpack('>II', head[16:24])
+            return 'image/png', width, height
+        if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+            width, height = struct.unpack('<HH', head[6:10])
+            return 'image/gif', width, height
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            chunk = head[12:16]
+            if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a' and len(head) >= 30:
+                width, height = struct.unpack('<HH', head[26:30])
+                return 'image/webp', width & 0x3fff, height & 0x3fff
+            if chunk == b'VP8L' and head[20:21] == b'\x2f' and len(head) >= 25:
+                bits = int.from_bytes(head[21:25], 'little')
+                return 'image/webp', (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+            if chunk == b'VP8X' and len(head) >= 30:
+                return 'image/webp', int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+            return 'image/webp', None, None
+        if head[:3] == b'\xff\xd8\xff':
+            dimensions = _jpeg_dimensions(f)
+            return ('image/jpeg', *dimensions) if dimensions else ('image/jpeg', None, None)
+    return None, None, None
+
+def _asset_listing(asset_files, cache_file):
+    """Returns the ASSET FILES lines for asset_files, probing only new or changed files.
+
+       Probe results are cached in cache_file by path, size and mtime, so a
+       repeat run only stats unchanged assets."""
+    cache = _load_json(cache_file, ASSET_CACHE_VERSION)
+    cached = cache.get('assets', {}) if cache else {}
+
+    assets = {}
+    lines = []
+    for relative_path, filepath in asset_files:
+        try:
+            size, mtime_ns = _file_key(os.stat(filepath))
+        except OSError:
+            # Dangling symlink or vanished file: list it by extension, as without probing
+            lines.append(f"File: {relative_path}, Mime Type: {mimetypes.guess_type(filepath)[0] or 'unknown'}\n")
+            continue
+        entry = cached.get(relative_path)
+        if entry is None or entry[:2] != [size, mtime_ns]:
+            try:
+                entry = [size, mtime_ns, *_probe_asset(filepath)]
+            except OSError:
+                # Unreadable: list it by extension, and probe it again next run
+                entry = None
+            except (struct.error, ValueError, IndexError):
+                # Malformed or half-written header: list it with unknown dimensions
+                entry = [size, mtime_ns, None, None, None]
+        if entry is not None:
+            assets[relative_path] = entry
+        _, _, mime_type, width, height = entry or [size, mtime_ns, None, None, None]
+        mime_type = mime_type or mimetypes.guess_type(filepath)[0] or 'unknown'
+        line = f"File: {relative_path}, Mime Type: {mime_type}, Size: {size} bytes"
+        if width is not None:
+            line += f", Dimensions: {width}x{height}"
+        lines.append(line + "\n")
+
+    if assets != cached:
+        _write_json_atomic(cache_file, {'version': ASSET_CACHE_VERSION, 'assets': assets})
+    return lines
+
+_DART_TOKEN_RE = re.compile(r"""
+      (?P<doc>///[^\n]*|/\*\*(?![*/]))
+    | (?P<comment>//[^\n]*|/\*)
+    | (?P<string>r?(?:'''|\"\"\"|'|"))
+    | (?P<newline>\n)
+    | (?P<space>[^\S\n]+)
+    | (?P<word>[A-Za-z0-9_$]+)
+    | (?P<op>=>|==|!=|<=|>=|\?\?=|\?\?|\?\.|\.\.\.|\.\.|&&|\|\||\+\+|--|[-+*/%&|^]=|~/=?|[^\sA-Za-z0-9_$])
+""", re.VERBOSE)
+_DART_COMMENT_RE = re.compile(r"/\*|\*/")
+_DART_CLASS_KEYWORDS = {'class', 'mixin', 'enum', 'extension'}
+_DART_CLASS_MODIFIERS = {'abstract', 'base', 'sealed', 'final', 'interface', 'macro'}
+
+def _end_of_dart_comment(source, pos):
+    """Returns the index just past the block comment starting at pos; Dart block comments nest."""
+    depth = 0
+    for match in _DART_COMMENT_RE.finditer(source, pos):
+        depth += 1 if match.group() == '/*' else -1
+        if depth == 0:
+            return match.end()
+    return len(source)
+
+def _end_of_dart_string(source, pos):
+    """Returns the index just past the string literal starting at pos, including interpolations."""
+    raw = source[pos] == 'r'
+    pos += raw
+    quote = source[pos:pos + 3] if source.startswith(("'''", '"""'), pos) else source[pos]
+    special = re.compile(re.escape(quote) + (r"|\n" if len(quote) == 1 else "") + ("" if raw else r"|\\|\$\{"))
+    pos += len(quote)
+    while True:
+        match = special.search(source, pos)
+        if match is None:
+            return len(source)
+        token = match.group()
+        if token == quote:
+            return match.end()
+        if token == '\n': # Unterminated single-line string
+            return match.start()
+        if token == '\\':
+            pos = match.end() + 1
+            continue
+        # ${ ... } may hold any expression, including braces and other strings
+        depth = 1
+        pos = match.end()
+        while depth and pos < len(source):
+            kind, end = _next_dart_token(source, pos)
+            text = source[pos:end]
+            depth += (text == '{') - (text == '}')
+            pos = end
+
+def _next_dart_token(source, pos):
+    """Returns (kind, end) of the Dart token starting at pos."""
+    match = _DART_TOKEN_RE.match(source, pos)
+    kind = match.lastgroup
+    if kind == 'string':
+        return kind, _end_of_dart_string(source, pos)
+    if source.startswith('/*', pos):
+        return kind, _end_of_dart_comment(source, pos)
+    return kind, match.end()
+
+def _dart_tokens(source):
+    """Yields (kind, text) for every token of a Dart source.
+
+       kind is one of doc, comment, string, newline, space, word or op.
+       Strings and comments are single tokens, so braces inside them never
+       affect the structure."""
+    pos = 0
+    while pos < len(source):
+        kind, end = _next_dart_token(source, pos)
+        yield kind, source[pos:end]
+        pos = end
+
+def _join_dart_tokens(tokens, minify):
+    """Joins (kind, text) tokens, where None marks original whitespace.
+
+       Whitespace becomes one space, or with minify is dropped wherever
+       the two neighbouring tokens would still lex the same without it."""
+    parts = []
+    previous = None
+    pending_space = False
+    for token in tokens:
+        if token is None:
+            pending_space = previous is not None
+            continue
+        if pending_space:
+            kind, text = token
+            if not minify:
+                parts.append(' ')
+            elif kind == 'word' and previous[0] == 'word':
+                parts.append(' ')
+            elif kind == 'string' and previous[0] in ('word', 'string'):
+                parts.append(' ')
+            elif kind == 'op' and previous[0] == 'op' and _DART_TOKEN_RE.match(previous[1] + text).end() > len(previous[1]):
+                parts.append(' ')
+        parts.append(token[1])
+        previous = token
+        pending_space = False
+    return ''.join(parts)
+
+def _skip_dart_balanced(tokens, i, stop=None):
+    """Returns the index after the bracket group starting at tokens[i].
+
+       With stop set, skips up to and including the first stop token at
+       nesting level zero instead."""
+    depth = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        i += 1
+        if kind != 'op':
+            continue
+        if text in '([{':
+            depth += 1
+        elif text in ')]}':
+            depth -= 1
+            if depth == 0 and stop is None:
+                return i
+        elif depth == 0 and text == stop:
+            return i
+    return i
+
+def _is_dart_class_header(words):
+    """Returns True if a declaration's top-level words open a class-like body.
+
+       mixin and extension are also valid member names, so the keyword has to
+       come first, after class modifiers only."""
+    for word in words:
+        if word in _DART_CLASS_KEYWORDS:
+            return True
+        if word not in _DART_CLASS_MODIFIERS:
+            return False
+    return False
+
+def outline_dart(source, minify=False):
+    """Reduces Dart source to its API surface.
+
+       Keeps directives, declarations, signatures, fields and doc comments;
+       drops function bodies, => expressions and ordinary comments. Brace
+       literals in initializers are shortened to {...}. Each declaration is
+       put on one line, indented by class nesting, or without indentation
+       and with the minimum whitespace if minify is set."""
+    tokens = list(_dart_tokens(source))
+    lines = []
+    depth = 0 # Class-like bodies currently open
+    statement = [] # Tokens of the declaration being collected, None for whitespace
+    nesting = 0 # Open ( [ { inside the statement
+    initializer = False # Seen a top-level '=' that starts a field or variable initializer
+    words = [] # Top-level words of the statement, without annotation names
+    annotation = None # 'at' after an '@', 'name' after an annotation's (dotted) name
+
+    def emit(text):
+        lines.append(text if minify else '  ' * depth + text)
+
+    def finish(terminator=''):
+        nonlocal statement, nesting, initializer, words, annotation
+        text = _join_dart_tokens(statement, minify).strip()
+        if text or terminator:
+            emit(text + terminator)
+        statement, nesting, initializer, words, annotation = [], 0, False, [], None
+
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == 'doc':
+            if not statement:
+                for number, line in enumerate(text.splitlines()):
+                    emit(line.strip() if number == 0 or minify else ' ' + line.strip())
+            i += 1
+            continue
+        if kind == 'comment':
+            i += 1
+            continue
+        if kind in ('space', 'newline'):
+            if statement and statement[-1] is not None:
+                statement.append(None)
+            i += 1
+            continue
+
+        if kind == 'op' and text == '{' and (nesting == 0 or initializer):
+            if initializer:
+                # Map, set or closure literal in an initializer
+                statement.append(('op', '{...}'))
+                i = _skip_dart_balanced(tokens, i)
+            elif _is_dart_class_header(words):
+                finish(' {')
+                depth += 1
+                i += 1
+            else:
+                # Function, method, getter or constructor body
+                while statement and statement[-1] is None:
+                    statement.pop()
+                finish(';')
+                i = _skip_dart_balanced(tokens, i)
+            continue
+        if kind == 'op' and nesting == 0:
+            if text == '}':
+                finish()
+                if depth:
+                    depth -= 1
+                    emit('}')
+                i += 1
+                continue
+            if text == ';':
+                statement.append((kind, text))
+                finish()
+                i += 1
+                continue
+            if text == '=>' and not initializer:
+                while statement and statement[-1] is None:
+                    statement.pop()
+                finish(';')
+                i = _skip_dart_balanced(tokens, i + 1, stop=';')
+                continue
+            if text == '=' and ':' not in words and 'operator' not in words:
+                initializer = True
+            if text == ':':
+                words.append(text)
+        if nesting == 0:
+            if kind == 'op' and (text == '@' or text == '.' and annotation == 'name'):
+                annotation = 'at'
+            elif kind == 'word' and annotation == 'at':
+                annotation = 'name'
+            else:
+                annotation = None
+                if kind == 'word':
+                    words.append(text)
+        if kind == 'op' and text in '([{':
+            nesting += 1
+        elif kind == 'op' and text in ')]}':
+            nesting -= 1
+        statement.append((kind, text))
+        i += 1
+    finish()
+    return '\n'.join(lines) + '\n' if lines else ''
+
+class _OutlineCache:
+    """Dart outlines of a run, keyed by mode and SHA-256 of the source.
+
+       Shared by the reader threads. Runs that reuse sections from a previous
+       bundle only outline the changed files, so entries are only pruned to
+       those used by a run that read every file."""
+
+    def __init__(self, cache_file, mode):
+        self._file = cache_file
+        self._mode = mode
+        cache = _load_json(cache_file, OUTLINE_CACHE_VERSION)
+        self._entries = cache.get('entries', {}) if cache else {}
+        self._used = {}
+
+    def outline(self, source):
+        """Returns the outline of source, computing it only on a cache miss."""
+        key = f"{self._mode}:{hashlib.sha256(source.encode('utf-8')).hexdigest()}"
+        result = self._entries.get(key)
+        if result is None:
+            result = outline_dart(source, minify=self._mode == 'minified')
+        self._used[key] = result
+        return result
+
+    def save(self, prune=True):
+        """Writes the cache if it changed, keeping only this run's entries if prune is set."""
+        entries = self._used if prune else {**self._entries, **self._used}
+        if entries == self._entries:
+            return
+        _write_json_atomic(self._file, {'version': OUTLINE_CACHE_VERSION, 'entries': entries})
 
-def combine_frontend_files(base_directory, output_file):
+def _copy_stream(src, dst, length):
+    """Copies length bytes from src to dst without holding more than a chunk in memory."""
+    while length > 0:
+        chunk = src.read(min(CHUNK_SIZE, length))
+        if not chunk:
+            raise EOFError(f"{length} bytes missing from {getattr(src, 'name', 'stream')}")
+        dst.write(chunk)
+        length -= len(chunk)
+
+def _spool_text_file(filepath, transform=None):
+    """Decodes a UTF-8 text file chunk by chunk into a spool.
+
+       Returns (spool, length, sha256) where spool is positioned at the start
+       of the encoded content. Large files spill to disk rather than memory.
+       transform, if given, is applied to the whole decoded text instead."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    digest = hashlib.sha256()
+    try:
+        with open(filepath, 'r', encoding='utf-8') as infile:
+            if transform is not None:
+                data = transform(infile.read()).encode('utf-8')
+                digest.update(data)
+                spool.write(data)
+            else:
+                while True:
+                    chunk = infile.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    data = chunk.encode('utf-8')
+                    digest.update(data)
+                    spool.write(data)
+    except BaseException:
+        spool.close()
+        raise
+    length = spool.tell()
+    spool.seek(0)
+    return spool, length, digest.hexdigest()
+
+def _load_section(filepath, old, dart_transform=None):
+    """Stats a text file and either keeps its previous section or spools it.
+
+       Returns (size, mtime_ns, old, spooled); old is None unless the file is
+       unchanged since the manifest entry, spooled is None otherwise.
+       dart_transform, if given, is applied to the text of .dart files."""
+    size, mtime_ns = _file_key(os.stat(filepath))
+    if old is not None and (old['size'], old['mtime_ns']) == (size, mtime_ns):
+        return size, mtime_ns, old, None
+    transform = dart_transform if filepath.endswith('.dart') else None
+    return size, mtime_ns, None, _spool_text_file(filepath, transform)
+
+def _load_sections(text_files, previous, jobs, dart_transform=None):
+    """Loads sections in walk order, reading up to `jobs` files concurrently.
+
+       Yields (relative_path, filepath, loaded, error) with exactly one of
+       loaded/error set. At most 2 * jobs files are in flight at a time."""
+    if jobs <= 1:
+        for relative_path, filepath in text_files:
+            try:
+                yield relative_path, filepath, _load_section(filepath, previous.get(relative_path), dart_transform), None
+            except Exception as e:
+                yield relative_path, filepath, None, e
+        return
+
+    def result(entry):
+        relative_path, filepath, future = entry
+        try:
+            return relative_path, filepath, future.result(), None
+        except Exception as e:
+            return relative_path, filepath, None, e
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for relative_path, filepath in text_files:
+            pending.append((relative_path, filepath, pool.submit(_load_section, filepath, previous.get(relative_path), dart_transform)))
+            if len(pending) >= 2 * jobs:
+                yield result(pending.popleft())
+        while pending:
+            yield result(pending.popleft())
+
+def _translate_bracket(line, start):
+    """Translates the gitignore bracket expression at line[start] to a regex class.
+
+       Follows git's wildmatch: '!' or '^' negates, a ']' first in the set is
+       literal, backslash escapes, a range whose ends are reversed only
+       matches its first end and [:class:] names ASCII character classes. Returns
+       (regex, index of the closing ']') or None for an unterminated set or
+       an unknown class name."""
+    i = start + 1
+    negate = line[i:i + 1] in ('!', '^')
+    i += negate
+    items = []
+    first = True
+    while i < len(line):
+        c = line[i]
+        if c == ']' and not first:
+            break
+        first = False
+        if line.startswith('[:', i):
+            end = line.find(':]', i + 2)
+            if end == -1 or line[i + 2:end] not in _POSIX_CLASSES:
+                return None
+            items.append(_POSIX_CLASSES[line[i + 2:end]])
+            i = end + 2
+            continue
+        if c == '\\' and i + 1 < len(line):
+            i += 1
+            c = line[i]
+        i += 1
+        if line[i:i + 1] == '-' and i + 1 < len(line) and line[i + 1] != ']':
+            high = line[i + 1]
+            i += 2
+            if high == '\\' and i < len(line):
+                high = line[i]
+                i += 1
+            # git compares the first end on its own before the range
+            items.append(f"{re.escape(c)}-{re.escape(high)}" if c <= high else re.escape(c))
+            continue
+        items.append(re.escape(c))
+    else:
+        return None
+    if negate:
+        # A negated set never matches the path separator
+        return '[^/' + ''.join(items) + ']', i
+    return ('[' + ''.join(items) + ']' if items else '(?!)'), i
+
+def _translate_gitignore(line, prefix=""):
+    """Translates one .gitignore line into a (regex, negate, dir_only) rule.
+
+       prefix is the posix path of the directory holding the .gitignore,
+       relative to the walk root. Returns None for blank lines and comments."""
+    line = line.rstrip('\r\n')
+    if line.startswith('#'):
+        return None
+    # Trailing spaces are ignored unless escaped with a backslash
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    elif line.startswith(('\\!', '\\#')):
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+    anchored = '/' in line
+    line = line.lstrip('/')
+
+    regex = ''
+    i = 0
+    while i < len(line):
+        c = line[i]
+        if line.startswith('**', i) and (i == 0 or line[i - 1] == '/') and line[i + 2:i + 3] in ('', '/'):
+            if i + 2 == len(line):
+                regex += '.*'
+            else:
+                regex += '(?:.*/)?'
+            i += 3
+            continue
+        if c == '*':
+            regex += '[^/]*'
+        elif c == '?':
+            regex += '[^/]'
+        elif c == '[':
+            bracket = _translate_bracket(line, i)
+            if bracket is None:
+                return None # Like git, a malformed set makes the pattern match nothing
+            body, i = bracket
+            regex += body
+        elif c == '\\' and i + 1 < len(line):
+            i += 1
+            regex += re.escape(line[i])
+        else:
+            regex += re.escape(c)
+        i += 1
+
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    if prefix:
+        regex = re.escape(prefix) + '/' + regex
+    try:
+        re.compile(regex)
+    except re.error:
+        return None
+    return regex, negate, dir_only
+
+def _compile_rules(rules):
+    """Compiles ordered rules into one matcher for directories and one for files.
+
+       Each matcher is a single regex whose alternatives are the rules in
+       reverse order, so the first alternative that matches is the rule git
+       would apply (the last matching one). Returns is_excluded(path, is_dir,
+       parent_excluded), where parent_excluded is the result for a path no
+       rule matches, i.e. whether its directory is excluded."""
+    def build(candidates):
+        if not candidates:
+            return None, {}
+        alternatives = [f"(?P<r{index}>{regex})" for index, (regex, _, _) in reversed(candidates)]
+        return re.compile('|'.join(alternatives)), {f"r{index}": negate for index, (_, negate, _) in candidates}
+
+    indexed = list(enumerate(rules))
+    dir_regex, dir_negates = build([(i, rule) for i, rule in indexed])
+    file_regex, file_negates = build([(i, rule) for i, rule in indexed if not rule[2]])
+
+    def is_excluded(path, is_dir, parent_excluded=False):
+        regex, negates = (dir_regex, dir_negates) if is_dir else (file_regex, file_negates)
+        match = regex.fullmatch(path) if regex is not None else None
+        if match is None:
+            return parent_excluded
+        return not negates[match.lastgroup]
+    return is_excluded
+
+def _build_rules(include, exclude):
+    """Returns the (rules, user_rules) pair _walk_tree starts from.
+
+       Later rules win: built-in excludes, then .gitignore files found during
+       the walk, then the caller's exclude and include patterns."""
+    rules = [_translate_gitignore(pattern) for pattern in DEFAULT_EXCLUDES]
+    user_rules = [_translate_gitignore(pattern) for pattern in exclude]
+    user_rules += [_translate_gitignore("!" + pattern) for pattern in include]
+    return rules, [rule for rule in user_rules if rule]
+
+def _include_dirs(include):
+    """Returns a predicate telling whether an excluded directory may hold an included path.
+
+       Git never looks inside an excluded directory, so `!build/keep.json`
+       alone would not bring the file back. For include patterns containing a
+       slash, the directories leading to the pattern are still descended
+       into, keeping only what the include rules match. Below the first
+       wildcard component every directory is descended into."""
+    ancestors = set()
+    subtrees = [] # Posix prefixes below which any directory may hold a match
+    for pattern in include:
+        pattern = pattern.rstrip(' /')
+        if '/' not in pattern:
+            continue # Unanchored, like git: re-include its parent directory instead
+        parts = pattern.lstrip('/').split('/')
+        for depth, part in enumerate(parts[:-1]):
+            if any(c in part for c in '*?[\\'):
+                subtrees.append('/'.join(parts[:depth]))
+                break
+            ancestors.add('/'.join(parts[:depth + 1]))
+
+    def may_hold_include(path):
+        return path in ancestors or any(not prefix or path.startswith(prefix + '/') for prefix in subtrees)
+    return may_hold_include
+
+def _own_file_filter(base_directory, output_file):
+    """Returns a predicate telling whether a relative path is the tool's own output.
+
+       That covers the output file, its sidecars, shards and temporary files,
+       which must never be bundled or trigger a rebuild in watch mode."""
+    output = os.path.relpath(output_file, base_directory)
+    shard_prefix = os.path.splitext(output)[0] + ".shard"
+    def is_own_file(relative_path):
+        return relative_path == output or relative_path.startswith((output + ".", shard_prefix))
+    return is_own_file
+
+def _walk_tree(base_directory, rules, user_rules, use_gitignore, on_directory=None, stats=None, include_dirs=None):
+    """Yields (relative_path, filepath) for every file that survives the rules.
+
+       Directories are visited in the same order as os.walk, but excluded ones
+       are pruned before they are ever listed, unless include_dirs (see
+       _include_dirs) says they lead to an included path; inside those only
+       what a negated rule matches is kept. Each .gitignore found on the
+       way adds its rules for its own subtree. on_directory, if given, is
+       called with the path of every directory that is listed. stats, if
+       given, collects matching time and what was skipped."""
+    def walk(directory, relative_dir, rules, is_excluded, parent_excluded=False):
+        if on_directory is not None:
+            on_directory(directory)
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            return
+        prefix = relative_dir.replace(os.sep, '/') if relative_dir else ''
+        if use_gitignore and any(entry.name == '.gitignore' for entry in entries):
+            try:
+                with open(os.path.join(directory, '.gitignore'), 'r', encoding='utf-8') as f:
+                    added = [_translate_gitignore(line, prefix) for line in f]
+            except (OSError, UnicodeDecodeError):
+                added = []
+            added = [rule for rule in added if rule]
+            if added:
+                rules = rules + added
+                is_excluded = _compile_rules(rules + user_rules)
+
+        subdirs = []
+        for entry in entries:
+            relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+            match_path = f"{prefix}/{entry.name}" if prefix else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            start = time.perf_counter()
+            excluded = is_excluded(match_path, is_dir, parent_excluded)
+            reopened = excluded and is_dir and include_dirs is not None and include_dirs(match_path)
+            if stats is not None and not reopened:
+                stats['phases']['filter'] += time.perf_counter() - start
+                if excluded and is_dir:
+                    stats['skipped_dirs'].append(relative_path)
+                elif excluded:
+                    stats['files']['skipped'] += 1
+            if excluded and not reopened:
+                continue
+            if is_dir:
+                # Like os.walk, symlinked directories are not followed
+                if not entry.is_symlink():
+                    subdirs.append((entry.path, relative_path, excluded))
+            else:
+                yield relative_path, entry.path
+        for path, relative_path, excluded in subdirs:
+            yield from walk(path, relative_path, rules, is_excluded, excluded)
+
+    yield from walk(base_directory, '', rules, _compile_rules(rules + user_rules))
+
+def _new_stats():
+    """Returns the empty statistics filled in by combine_frontend_files."""
+    return {
+        'phases': dict.fromkeys(('walk', 'filter', 'assets', 'read', 'write', 'sidecars'), 0.0),
+        'total_seconds': 0.0,
+        'unchanged': False,
+        'files': dict.fromkeys(('text', 'assets', 'reused', 'deduplicated', 'errors', 'skipped'), 0),
+        'bytes': dict.fromkeys(('read', 'written'), 0),
+        'skipped_dirs': [],
+        'peak_memory_bytes': None,
+    }
+
+def _peak_memory():
+    """Returns the peak resident set size of this process in bytes, or None where unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _finish_stats(run_stats, start, stats):
+    """Completes run_stats and copies them into the caller's dict, if any."""
+    run_stats['total_seconds'] = time.perf_counter() - start
+    run_stats['peak_memory_bytes'] = _peak_memory()
+    if stats is not None:
+        stats.update(run_stats)
+
+def combine_frontend_files(base_directory, output_file, incremental=False, jobs=DEFAULT_JOBS,
+                           include=(), exclude=(), use_gitignore=True, index=False, shard_tokens=None,
+                           dedupe=False, compress=None, probe_assets=True, stats=None, dart_mode='full',
+                           on_directory=None, on_file=None):
     """Combines specific frontend file types from a Flutter project,
-       excluding build directories, and lists assets."""
+       excluding build directories, and lists assets.
+
+       Paths are filtered with .gitignore semantics: DEFAULT_EXCLUDES, every
+       .gitignore in the tree (unless use_gitignore=False), then the exclude
+       patterns and finally the include patterns, which re-include paths the
+       earlier rules dropped. Excluded directories are never descended into,
+       except on the way to an include pattern with a slash in it, so
+       include=['build/keep.json'] keeps that one file of build/.
+
+       With incremental=True a manifest of every section (path, size, mtime
+       and content hash) is kept beside the output file. Later runs only
+       reread files whose size or mtime changed, copy the other sections
+       from the previous bundle, and leave the output untouched when
+       nothing changed at all.
+
+       Files are read and decoded by a pool of `jobs` threads and streamed
+       into the output in walk order; jobs=1 reads them one at a time.
+
+       With index=True the path, byte offset, length and hash of every
+       section are written to a sidecar index that BundleReader uses to
+       extract single files without scanning the bundle.
+
+       With shard_tokens set the bundle is also split into numbered shard
+       files of at most that many estimated tokens each, highest-priority
+       sources first, plus a sidecar listing what went where.
+
+       With dedupe=True a section whose content hash matches an earlier one
+       is written as a reference to that first path instead of repeating
+       its body. compress='gzip' or 'zstd' writes the whole bundle as a
+       compressed stream; it cannot be combined with incremental, index or
+       shard_tokens, which all need random access to the output.
+
+       With probe_assets=True (the default) each asset is identified from its
+       magic bytes, and its byte size and image dimensions (PNG, JPEG, GIF,
+       WebP) are listed. Results are cached beside the output by path, size
+       and mtime. probe_assets=False lists extension-based mime types only.
+
+       If stats is a dict it receives per-phase wall times, file and byte
+       counts, the pruned directories and the peak memory of the run. read
+       is the time the writer waited for file contents and write the time
+       it spent producing output, so with a thread pool the two show which
+       side of the pipeline is the bottleneck.
+
+       dart_mode='outline' replaces each .dart file with outline_dart() of
+       it: directives, declarations, signatures, fields and doc comments.
+       'minified' is the same outline with minimal whitespace. Outlines are
+       cached beside the output by the hash of the source.
+
+       on_directory and on_file, if given, are called with the path of every
+       directory the walk lists and every file it keeps, so watch mode knows
+       what to watch without walking the tree again."""
+    if compress and (incremental or index or shard_tokens):
+        raise ValueError("Compressed output cannot be combined with incremental, index or shard_tokens")
+    if dart_mode not in DART_MODES:
+        raise ValueError(f"Unknown Dart mode: {dart_mode}")
+    if shard_tokens is not None and shard_tokens <= 0:
+        raise ValueError(f"shard_tokens must be positive, got {shard_tokens}")
+    open_output = _compressor(compress)
+    run_stats = _new_stats()
+    phases = run_stats['phases']
+    start = time.perf_counter()
 
     text_extensions = ['.dart', '.yaml', '.yml', '.json', '.xml', '.txt'] # Flutter specific text file types
     asset_dir = "assets" # Flutter asset directory name
-    build_dirs = ['.git', 'build', 'ios/build', 'android/build', '.pub-cache'] # Common Flutter build/cache directories
 
+    manifest_file = output_file + MANIFEST_SUFFIX
+    index_file = output_file + INDEX_SUFFIX
+    shards_file = output_file + SHARDS_SUFFIX
+    tmp_output_file = output_file + ".tmp"
+    outline_cache = _OutlineCache(output_file + OUTLINE_CACHE_SUFFIX, dart_mode) if dart_mode != 'full' else None
+    dart_transform = outline_cache.outline if outline_cache is not None else None
+    is_own_file = _own_file_filter(base_directory, output_file)
+
+    text_files = []
     asset_files = []
-    with open(output_file, 'w', encoding='utf-8') as outfile:
-        # Traverse the entire directory tree
-        for root, dirs, files in os.walk(base_directory):
-            # Remove build directories from walk to avoid traversing them
-            dirs[:] = [d for d in dirs if d not in build_dirs]
+    clock = time.perf_counter()
+    for relative_path, filepath in _walk_tree(base_directory, *_build_rules(include, exclude), use_gitignore, on_directory,
+                                              stats=run_stats, include_dirs=_include_dirs(include)):
+        if is_own_file(relative_path):
+            continue
+        if on_file is not None:
+            on_file(filepath)
 
-            for filename in files:
-                filepath = os.path.join(root, filename)
-                relative_path = os.path.relpath(filepath, base_directory)
-                root_path = os.path.relpath(root, base_directory)
+        _, ext = os.path.splitext(relative_path)
+        if ext in text_extensions:
+            text_files.append((relative_path, filepath))
+        # Handle asset files if the file is directly under assets, or a folder under assets
+        elif asset_dir in relative_path.split(os.sep):
+            asset_files.append((relative_path, filepath))
+    phases['walk'] = time.perf_counter() - clock - phases['filter']
+    run_stats['files']['assets'] = len(asset_files)
 
+    clock = time.perf_counter()
+    asset_block = "\n\n--- ASSET FILES ---\n\n"
+    if probe_assets:
+        asset_block += "".join(_asset_listing(asset_files, output_file + ASSET_CACHE_SUFFIX))
+    else:
+        for path, filepath in asset_files:
+            file_mime_type, _ = mimetypes.guess_type(filepath)
+            asset_block += f"File: {path}, Mime Type: {file_mime_type or 'unknown'}\n"
+    asset_bytes = asset_block.encode('utf-8')
+    assets_hash = hashlib.sha256(asset_bytes).hexdigest()
+    phases['assets'] = time.perf_counter() - clock
 
-                # Skip .git and build directories
-                if '.git' in relative_path.split(os.sep) or any(build_dir in root_path.split(os.sep) for build_dir in build_dirs):
-                    continue
+    # Options that change section content invalidate every reusable section
+    manifest_options = {'dedupe': dedupe, 'dart_mode': dart_mode}
+    previous = {}
+    if incremental:
+        manifest = _load_manifest(manifest_file, output_file, manifest_options)
+        if manifest is not None:
+            previous = {section['path']: section for section in manifest['sections']}
+            current = []
+            for relative_path, filepath in text_files:
+                try:
+                    current.append([relative_path, *_file_key(os.stat(filepath))])
+                except OSError:
+                    current.append(None)
+            # Nothing was added, removed or touched since the last run, including
+            # files that failed to read then and would fail again
+            if current == manifest.get('files') and manifest.get('assets_sha256') == assets_hash:
+                clock = time.perf_counter()
+                if index and not _index_is_current(index_file, output_file):
+                    _write_index(index_file, output_file, manifest['sections'], len(asset_bytes))
+                if shard_tokens and not _shards_are_current(shards_file, output_file, shard_tokens):
+                    _write_shards(shards_file, output_file, manifest['sections'], len(asset_bytes), shard_tokens)
+                phases['sidecars'] = time.perf_counter() - clock
+                run_stats['unchanged'] = True
+                run_stats['files']['text'] = run_stats['files']['reused'] = len(manifest['sections'])
+                run_stats['files']['errors'] = len(current) - len(manifest['sections'])
+                _finish_stats(run_stats, start, stats)
+                return
 
-                _, ext = os.path.splitext(filename)
-                if ext in text_extensions:
+    sections = []
+    files = [] # [path, size, mtime_ns] of every text file, see _write_manifest
+    # sha256 -> section holding the first copy of that content, for dedupe
+    first_copies = {}
+    previous_output = open(output_file, 'rb') if previous else None
+    try:
+        with open(tmp_output_file, 'wb') as raw_outfile, open_output(raw_outfile) as outfile:
+            # Tracked by hand since compressed writers report compressed positions
+            position = 0
+            clock = time.perf_counter()
+            for relative_path, filepath, loaded, error in _load_sections(text_files, previous, jobs, dart_transform):
+                now = time.perf_counter()
+                phases['read'] += now - clock
+                clock = now
+                if error is not None:
+                    print(f"Error reading {filepath}: {error}")
+                    run_stats['files']['errors'] += 1
                     try:
-                        with open(filepath, 'r', encoding='utf-8') as infile:
-                            content = infile.read()
-                            outfile.write(f"\n\n--- FILE: {relative_path} ---\n\n")
-                            outfile.write(content)
-                    except Exception as e:
-                        print(f"Error reading {filepath}: {e}")
-                # Handle asset files if the file is directly under assets, or a folder under assets
-                elif asset_dir in relative_path.split(os.sep):
-                    file_mime_type, _ = mimetypes.guess_type(filepath)
-                    asset_files.append((relative_path, file_mime_type or 'unknown'))
-
-        # Write the list of asset files to the end of the output file
-        outfile.write("\n\n--- ASSET FILES ---\n\n")
-        for path, mime_type in asset_files:
-            outfile.write(f"File: {path}, Mime Type: {mime_type}\n")
+                        files.append([relative_path, *_file_key(os.stat(filepath))])
+                    except OSError:
+                        files.append(None)
+                    continue
+                size, mtime_ns, old, spooled = loaded
+                files.append([relative_path, size, mtime_ns])
+                digest = old['sha256'] if old is not None else spooled[2]
+                header = _section_header(relative_path).encode('utf-8')
+                outfile.write(header)
+                position += len(header)
+                section = {
+                    'path': relative_path,
+                    'size': size,
+                    'mtime_ns': mtime_ns,
+                    'sha256': digest,
+                    'offset': position,
+                }
+                first = first_copies.get(digest) if dedupe else None
+                length = old['length'] if old is not None else spooled[1]
+                reference = _reference_body(first['path']).encode('utf-8') if first is not None else None
+                if reference is not None and len(reference) < length:
+                    # Offset and length keep pointing at real content, which
+                    # readers and later incremental runs rely on
+                    outfile.write(reference)
+                    position += len(reference)
+                    section.update(offset=first['offset'], length=first['length'], same_as=first['path'])
+                    run_stats['files']['deduplicated'] += 1
+                    if spooled is not None:
+                        spooled[0].close()
+                elif old is not None:
+                    # Unchanged since the last run: copy the content verbatim
+                    previous_output.seek(old['offset'])
+                    _copy_stream(previous_output, outfile, old['length'])
+                    section['length'] = old['length']
+                    position += old['length']
+                    run_stats['files']['reused'] += 1
+                else:
+                    spool, length, _ = spooled
+                    with spool:
+                        _copy_stream(spool, outfile, length)
+                    section['length'] = length
+                    position += length
+                if spooled is not None:
+                    run_stats['bytes']['read'] += spooled[1]
+                first_copies.setdefault(digest, section)
+                sections.append(section)
+                now = time.perf_counter()
+                phases['write'] += now - clock
+                clock = now
+
+            # Write the list of asset files to the end of the output file
+            outfile.write(asset_bytes)
+    finally:
+        if previous_output is not None:
+            previous_output.close()
+    os.replace(tmp_output_file, output_file)
+    if not index:
+        # An index of the previous bundle would point readers at the wrong bytes
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(index_file)
+    if not shard_tokens:
+        # Likewise, shards of the previous bundle no longer match it
+        _remove_shards(output_file)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(shards_file)
+    phases['write'] += time.perf_counter() - clock
+    run_stats['files']['text'] = len(sections)
+    run_stats['bytes']['written'] = position + len(asset_bytes)
+
+    clock = time.perf_counter()
+    if incremental:
+        _write_manifest(manifest_file, output_file, sections, files, assets_hash, manifest_options)
+    if index:
+        _write_index(index_file, output_file, sections, len(asset_bytes))
+    if shard_tokens:
+        _write_shards(shards_file, output_file, sections, len(asset_bytes), shard_tokens)
+    if outline_cache is not None:
+        outline_cache.save(prune=not previous)
+    phases['sidecars'] = time.perf_counter() - clock
+    _finish_stats(run_stats, start, stats)
+
+class _Inotify:
+    """Minimal ctypes binding to Linux inotify.
+
+       Raises OSError where inotify is unavailable so callers can fall back
+       to polling."""
+
+    # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    # IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    MASK = 0x002 | 0x004 | 0x008 | 0x040 | 0x080 | 0x100 | 0x200 | 0x400 | 0x800
+    IN_IGNORED = 0x8000
+    _EVENT = struct.Struct('iIII') # wd, mask, cookie, len; followed by len bytes of name
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = {}
+
+    def close(self):
+        os.close(self._fd)
+
+    def watch(self, directory):
+        """Starts watching directory; watching it again is a no-op.
+
+           Raises OSError if the watch cannot be added, with errno ENOSPC
+           once the user's max_user_watches limit is reached."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), directory)
+        self._watches[wd] = directory
+
+    def read(self, timeout):
+        """Waits up to timeout seconds and returns the changed paths."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        position = 0
+        while position < len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, position)
+            position += self._EVENT.size
+            name = os.fsdecode(data[position:position + length].rstrip(b'\0'))
+            position += length
+            directory = self._watches.get(wd)
+            if mask & self.IN_IGNORED:
+                self._watches.pop(wd, None)
+            if directory is not None:
+                paths.append(os.path.join(directory, name) if name else directory)
+        return paths
+
+def _snapshot(paths):
+    """Returns the (size, mtime) of every path that still exists."""
+    snapshot = {}
+    for path in paths:
+        try:
+            snapshot[path] = _file_key(os.stat(path))
+        except OSError:
+            pass
+    return snapshot
+
+def watch_frontend_files(base_directory, output_file, debounce=0.1, poll_interval=0.5, **options):
+    """Keeps output_file up to date with the project until interrupted.
+
+       Rebuilds incrementally, so only sections of changed files are reread,
+       and every file is replaced atomically. Changes are picked up through
+       inotify where available, otherwise by polling the stat of every
+       walked file and directory each poll_interval seconds. Bursts of
+       events are merged until debounce seconds pass without one."""
+    rules, user_rules = _build_rules(options.get('include', ()), options.get('exclude', ()))
+    include_dirs = _include_dirs(options.get('include', ()))
+    is_own_file = _own_file_filter(base_directory, output_file)
+    max_delay = 1.0 - debounce # Keep a rebuild within a second of the first save, even mid-burst
+
+    def rebuild():
+        directories, files = [], []
+        try:
+            combine_frontend_files(base_directory, output_file, incremental=True, on_directory=directories.append,
+                                   on_file=files.append, **options)
+            return directories, files
+        except Exception as e:
+            print(f"Error combining frontend files: {e}")
+        # The failed run may not have finished its walk
+        directories = []
+        files = list(_walk_tree(base_directory, rules, user_rules, options.get('use_gitignore', True), directories.append,
+                                include_dirs=include_dirs))
+        return directories, [filepath for relative_path, filepath in files if not is_own_file(relative_path)]
+
+    def is_relevant(path):
+        return not is_own_file(os.path.relpath(path, base_directory))
+
+    unwatched = set()
+    def add_watches(directories):
+        """Watches every directory; returns False once inotify runs out of watches."""
+        for directory in directories:
+            try:
+                inotify.watch(directory)
+            except OSError as e:
+                if e.errno in (errno.ENOSPC, errno.ENOMEM):
+                    print(f"Warning: cannot watch {directory} ({e.strerror}; see fs.inotify.max_user_watches), "
+                          "falling back to polling")
+                    return False
+                # A directory removed since the walk is picked up by its parent's watch
+                if e.errno != errno.ENOENT and directory not in unwatched:
+                    print(f"Warning: not watching {directory}: {e.strerror}")
+                    unwatched.add(directory)
+        return True
+
+    try:
+        inotify = _Inotify()
+    except OSError:
+        inotify = None
+
+    directories, files = rebuild()
+    print(f"Watching {base_directory} for changes ({'inotify' if inotify else 'polling'})")
+    try:
+        # Watches are only added after a walk; the events of our own writes need none
+        watching = inotify is not None and add_watches(directories)
+        while watching:
+            if not any(is_relevant(path) for path in inotify.read(None)):
+                continue
+            deadline = time.monotonic() + max_delay
+            while time.monotonic() < deadline and inotify.read(debounce):
+                pass
+            directories, files = rebuild()
+            watching = add_watches(directories)
+        if inotify is not None:
+            inotify.close()
+            inotify = None
+
+        watched = directories + files
+        snapshot = _snapshot(watched)
+        while True:
+            time.sleep(poll_interval)
+            if _snapshot(watched) == snapshot:
+                continue
+            # Let a burst of saves settle before rebuilding
+            deadline = time.monotonic() + max_delay
+            current = _snapshot(watched)
+            while time.monotonic() < deadline:
+                time.sleep(debounce)
+                settled = _snapshot(watched)
+                if settled == current:
+                    break
+                current = settled
+            directories, files = rebuild()
+            watched = directories + files
+            snapshot = _snapshot(watched)
+    finally:
+        if inotify is not None:
+            inotify.close()
+
+def _positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value}") from None
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
 if __name__ == "__main__":
-    base_directory = "."  # Project Root - where the script runs (Flutter project root)
-    output_file = "combined_frontend.txt"
-    combine_frontend_files(base_directory, output_file)
-    print(f"Combined frontend files into {output_file}")
+    parser = argparse.ArgumentParser(description="Combine Flutter frontend sources into a single text file.")
+    parser.add_argument("base_directory", nargs="?", default=".", help="Project Root - where the script runs (Flutter project root)")
+    parser.add_argument("-o", "--output", default="combined_frontend.txt", help="Output file")
+    parser.add_argument("--incremental", action="store_true", help="Reuse unchanged sections via a manifest next to the output file")
+    parser.add_argument("-j", "--jobs", type=_positive_int, default=DEFAULT_JOBS, help=f"Number of reader threads (default: {DEFAULT_JOBS}, 1 reads serially)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN", help="Additional .gitignore-style pattern to leave out (repeatable)")
+    parser.add_argument("--include", action="append", default=[], metavar="PATTERN", help="Pattern to keep even if ignored, e.g. build/keep.json (repeatable)")
+    parser.add_argument("--no-gitignore", action="store_true", help="Do not apply .gitignore files found in the tree")
+    parser.add_argument("--index", action="store_true", help=f"Also write a byte-offset index ({INDEX_SUFFIX}) next to the output file")
+    parser.add_argument("--shard-tokens", type=_positive_int, metavar="N", help="Also split the output into shards of at most N estimated tokens each")
+    parser.add_argument("--dedupe", action="store_true", help="Write files identical to an earlier one as a reference to it")
+    parser.add_argument("--compress", choices=["gzip", "zstd"], help="Write the output as a compressed stream")
+    parser.add_argument("--no-probe-assets", action="store_true", help="List assets by extension only, without reading their headers")
+    parser.add_argument("--dart", choices=DART_MODES, default='full', help="Bundle .dart files in full, as an API outline, or as a minified outline")
+    parser.add_argument("--stats", action="store_true", help="Print per-phase timings, counts and peak memory as JSON")
+    parser.add_argument("--watch", action="store_true", help="Keep the output up to date as files change (implies --incremental)")
+    reader = parser.add_mutually_exclusive_group()
+    reader.add_argument("--list", action="store_true", help="List the files in an indexed output file instead of combining")
+    reader.add_argument("--extract", action="append", metavar="PATH", help="Print a file from an indexed output file instead of combining (repeatable)")
+    reader.add_argument("--verify", action="store_true", help="Check every file in an indexed output file against its hash instead of combining")
+    args = parser.parse_args()
+
+    if args.list or args.extract or args.verify:
+        try:
+            with BundleReader(args.output) as bundle:
+                if args.list:
+                    for path in bundle.paths():
+                        print(path)
+                elif args.extract:
+                    for path in args.extract:
+                        sys.stdout.buffer.write(bundle.read(path))
+                else:
+                    failed = [path for path in bundle.paths() if not bundle.verify(path)]
+                    for path in failed:
+                        print(f"Hash mismatch: {path}")
+                    sys.exit(1 if failed else 0)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Error reading {args.output}: {e}")
+        except KeyError as e:
+            sys.exit(f"Not in {args.output}: {e.args[0]}")
+        sys.exit(0)
+
+    options = dict(jobs=args.jobs, include=args.include, exclude=args.exclude, use_gitignore=not args.no_gitignore,
+                   index=args.index, shard_tokens=args.shard_tokens, dedupe=args.dedupe,
+                   probe_assets=not args.no_probe_assets, dart_mode=args.dart)
+    if args.compress and (args.incremental or args.watch or args.index or args.shard_tokens):
+        parser.error("--compress cannot be combined with --incremental, --watch, --index or --shard-tokens")
+    if args.watch:
+        try:
+            watch_frontend_files(args.base_directory, args.output, **options)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    stats = {}
+    try:
+        combine_frontend_files(args.base_directory, args.output, incremental=args.incremental, compress=args.compress,
+                               stats=stats, **options)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    if args.stats:
+        print(json.dumps(stats, indent=2))
+    else:
+        print(f"Combined frontend files into {args.output}")
@@ -0,0 +1,74 @@
+import struct
+
+import pytest
+
+import combinefrontend
+
+PNG = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>IIBBBBB', 640, 480, 8, 6, 0, 0, 0)
+APP0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + bytes(9)
+SOF0 = b'\xff\xc0' + struct.pack('>HBHH', 17, 8, 200, 300)
+
+def _riff(chunk, body):
+    return b'RIFF' + struct.pack('<I', 4 + 8 + len(body)) + b'WEBP' + chunk + struct.pack('<I', len(body)) + body
+
+@pytest.mark.parametrize("data, expected", [
+    (PNG, ('image/png', 640, 480)),
+    (b'GIF89a' + struct.pack('<HH', 32, 16), ('image/gif', 32, 16)),
+    (b'GIF87a' + struct.pack('<HH', 1, 2) + bytes(20), ('image/gif', 1, 2)),
+    (_riff(b'VP8 ', b'\x00\x00\x00\x9d\x01\x2a' + struct.pack('<HH', 100, 50)), ('image/webp', 100, 50)),
+    (_riff(b'VP8L', b'\x2f' + (99 | 49 << 14).to_bytes(4, 'little')), ('image/webp', 100, 50)),
+    (_riff(b'VP8X', bytes(4) + (99).to_bytes(3, 'little') + (49).to_bytes(3, 'little')), ('image/webp', 100, 50)),
+    (b'\xff\xd8' + APP0 + SOF0, ('image/jpeg', 300, 200)),
+    (b'\xff\xd8' + APP0 + b'\xff\xff' + SOF0, ('image/jpeg', 300, 200)), # Fill bytes before a marker
+    (b'\xff\xd8' + APP0 + b'\xff\xd9', ('image/jpeg', None, None)),
+    (b'plain text', (None, None, None)),
+    (b'', (None, None, None)),
+])
+def test_probe_asset(tmp_path, data, expected):
+    path = tmp_path / "asset"
+    path.write_bytes(data)
+    assert combinefrontend._probe_asset(str(path)) == expected
+
+@pytest.mark.parametrize("data", [PNG[:length] for length in (8, 16, 20, 23)] + [
+    b'GIF89a\x01',
+    _riff(b'VP8 ', b'\x00\x00\x00\x9d\x01')[:28],
+    b'RIFF\x00\x00\x00\x00WEBPVP8L',
+    b'\xff\xd8\xff\xc0\x00',
+    b'\xff\xd8' + APP0[:6],
+    b'\xff\xd8' + APP0 + SOF0[:6],
+])
+def test_probe_truncated_header(tmp_path, data):
+    path = tmp_path / "asset"
+    path.write_bytes(data)
+    _, width, height = combinefrontend._probe_asset(str(path))
+    assert width is None and height is None
+
+def test_asset_listing_lists_truncated_assets(tmp_path):
+    (tmp_path / "trunc.png").write_bytes(PNG[:16])
+    (tmp_path / "icon.png").write_bytes(PNG)
+    assets = [(name, str(tmp_path / name)) for name in ("trunc.png", "icon.png")]
+    cache_file = str(tmp_path / "out.txt.assets.json")
+    lines = combinefrontend._asset_listing(assets, cache_file)
+    assert lines == [
+        "File: trunc.png, Mime Type: image/png, Size: 16 bytes\n",
+        f"File: icon.png, Mime Type: image/png, Size: {len(PNG)} bytes, Dimensions: 640x480\n",
+    ]
+    # A second run is served from the cache
+    assert combinefrontend._asset_listing(assets, cache_file) == lines
+
+def test_asset_listing_lists_unreadable_assets(tmp_path, monkeypatch):
+    (tmp_path / "gone.png").symlink_to(tmp_path / "missing.png")
+    (tmp_path / "locked.png").write_bytes(PNG)
+    assets = [(name, str(tmp_path / name)) for name in ("gone.png", "locked.png")]
+    cache_file = str(tmp_path / "out.txt.assets.json")
+
+    def unreadable(filepath):
+        raise PermissionError(13, "Permission denied", filepath)
+    monkeypatch.setattr(combinefrontend, "_probe_asset", unreadable)
+    assert combinefrontend._asset_listing(assets, cache_file) == [
+        "File: gone.png, Mime Type: image/png\n",
+        f"File: locked.png, Mime Type: image/png, Size: {len(PNG)} bytes\n",
+    ]
+    # Once readable again the asset is probed, since the failure was not cached
+    monkeypatch.undo()
+    assert combinefrontend._asset_listing(assets, cache_file)[1].endswith("Dimensions: 640x480\n")
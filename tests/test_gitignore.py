@@ -0,0 +1,97 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import combinefrontend
+
+# (.gitignore lines, files to create); every case is checked against git itself
+CASES = [
+    (["*.log"], ["a.log", "a.txt", "dir/b.log"]),
+    (["/build"], ["build/out.txt", "sub/build/out.txt"]),
+    (["build/"], ["build", "sub/build/out.txt", "other/build.txt"]),
+    (["doc/*.txt"], ["doc/a.txt", "doc/x/a.txt", "a.txt"]),
+    (["**/foo"], ["foo", "a/b/foo", "a/foobar"]),
+    (["a/**/b"], ["a/b", "a/x/y/b", "x/a/b"]),
+    (["abc/**"], ["abc/x", "abc/d/y", "abc.txt"]),
+    (["*.txt", "!keep.txt"], ["keep.txt", "x.txt", "d/keep.txt"]),
+    (["logs/", "!logs/keep.log"], ["logs/keep.log", "logs/other.log"]),
+    (["\\#hash", "\\!bang"], ["#hash", "!bang", "hash"]),
+    (["file[0-9].txt"], ["file3.txt", "filex.txt"]),
+    (["file[!0-9].txt"], ["file3.txt", "filex.txt"]),
+    (["?.md"], ["a.md", "ab.md"]),
+    (["trailing\\ ", "spaces   "], ["trailing ", "trailing", "spaces"]),
+    # Bracket expressions git accepts, and malformed ones that must not crash the walk
+    (["[!]]w", "[a-]v", "[]a]u", "[!a]t"], ["!w", "]w", "aw", "-v", "av", "bv", "]u", "au", "bu", "at", "bt"]),
+    (["[z-a]x", "[z-ab]y", "[\\]]z"], ["ax", "zx", "by", "ay", "]z", "az"]),
+    (["[[:alpha:]]x", "[[:digit:][:upper:]]y", "[![:lower:]]z"], ["ax", "Ax", "1x", "1y", "Ay", "ay", "az", "Az"]),
+    (["foo[", "[[:nope:]]x", "[[:alpha:]x"], ["foo[", "ax", "[x"]),
+    (["# comment", "", "lib/*.g.dart"], ["lib/a.g.dart", "lib/a.dart", "lib/sub/b.g.dart", "# comment"]),
+]
+
+def _make_tree(root, gitignore, files):
+    with open(os.path.join(root, ".gitignore"), 'w', encoding='utf-8') as f:
+        f.write("\n".join(gitignore) + "\n")
+    for path in files:
+        filepath = os.path.join(root, *path.split('/'))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(path)
+
+def _walked(root, rules=(), user_rules=(), include_dirs=None):
+    rules = [combinefrontend._translate_gitignore('.git'), *rules]
+    return {relative_path.replace(os.sep, '/')
+            for relative_path, _ in combinefrontend._walk_tree(str(root), rules, list(user_rules), True, include_dirs=include_dirs)}
+
+@pytest.mark.skipif(shutil.which('git') is None, reason="needs git")
+@pytest.mark.parametrize("gitignore, files", CASES)
+def test_walk_matches_git(tmp_path, gitignore, files):
+    _make_tree(tmp_path, gitignore, files)
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    listed = subprocess.run(["git", "ls-files", "--others", "--exclude-standard", "-z"], cwd=tmp_path,
+                            check=True, capture_output=True, text=True).stdout
+    assert _walked(tmp_path) == set(filter(None, listed.split('\0')))
+
+@pytest.mark.parametrize("line, expected", [
+    ("# comment", None),
+    ("", None),
+    ("/", None),
+    ("*.dart", ("(?:.*/)?[^/]*\\.dart", False, False)),
+    ("!build/", ("(?:.*/)?build", True, True)),
+    ("/pubspec.lock", ("pubspec\\.lock", False, False)),
+])
+def test_translate_gitignore(line, expected):
+    assert combinefrontend._translate_gitignore(line) == expected
+
+def test_translate_gitignore_prefix():
+    regex, _, _ = combinefrontend._translate_gitignore("*.json", prefix="ios/Runner")
+    assert regex.startswith("ios/Runner/")
+
+def test_last_matching_rule_wins():
+    rules = [combinefrontend._translate_gitignore(line) for line in ("*.txt", "!keep.txt", "keep.txt")]
+    is_excluded = combinefrontend._compile_rules(rules)
+    assert is_excluded("keep.txt", False)
+    assert is_excluded("x.txt", False)
+    assert not combinefrontend._compile_rules(rules[:2])("keep.txt", False)
+
+def test_parent_excluded_applies_when_no_rule_matches():
+    is_excluded = combinefrontend._compile_rules([combinefrontend._translate_gitignore("!keep.json")])
+    assert is_excluded("build/other.json", False, parent_excluded=True)
+    assert not is_excluded("build/keep.json", False, parent_excluded=True)
+    assert not is_excluded("other.json", False)
+
+def test_include_reaches_into_excluded_directory(tmp_path):
+    _make_tree(tmp_path, [], ["build/keep.json", "build/other.json", "build/app/a.json",
+                              "build/deep/x/k.json", "lib/a.dart"])
+    include = ["build/keep.json", "build/**/k.json"]
+    rules, user_rules = combinefrontend._build_rules(include, ())
+    walked = _walked(tmp_path, rules, user_rules, combinefrontend._include_dirs(include))
+    assert walked == {".gitignore", "build/keep.json", "build/deep/x/k.json", "lib/a.dart"}
+
+def test_include_dirs():
+    may_hold_include = combinefrontend._include_dirs(["build/keep.json", "ios/**/x.json", "keep.json"])
+    assert may_hold_include("build")
+    assert not may_hold_include("build/app")
+    assert may_hold_include("ios") and may_hold_include("ios/Pods/a")
+    assert not may_hold_include("android")
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+import combinefrontend
+
+def _write(root, path, text):
+    filepath = root / path
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    filepath.write_text(text)
+
+def _make_project(root):
+    _write(root, "pubspec.yaml", "name: app\n")
+    for i in range(20):
+        _write(root, f"lib/src/widget_{i}.dart", f"class Widget{i} {{\n  int build() {{ return {i}; }}\n}}\n")
+    _write(root, "lib/copy.json", '{"same": "content in two places"}\n')
+    _write(root, "test/copy.json", '{"same": "content in two places"}\n')
+    _write(root, "lib/empty.txt", "")
+    _write(root, "assets/logo.png", "not really a png")
+
+def _edit_project(root):
+    _write(root, "lib/src/widget_3.dart", "class Widget3 {\n  String build() => 'changed';\n}\n")
+    _write(root, "lib/src/widget_20.dart", "class Widget20 {}\n")
+    _write(root, "test/copy.json", '{"same": "no longer"}\n')
+    os.remove(root / "lib/src/widget_7.dart")
+    # Same size and content, new mtime: the section is reread but must not change
+    path = root / "lib/src/widget_11.dart"
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+
+@pytest.mark.parametrize("options", [
+    {},
+    {'jobs': 1},
+    {'dedupe': True},
+    {'dart_mode': 'outline'},
+    {'index': True, 'shard_tokens': 100},
+])
+def test_incremental_matches_full_rebuild(tmp_path, options):
+    project = tmp_path / "project"
+    _make_project(project)
+    incremental_output = str(tmp_path / "incremental.txt")
+    full_output = str(tmp_path / "full.txt")
+
+    combinefrontend.combine_frontend_files(str(project), incremental_output, incremental=True, **options)
+    _edit_project(project)
+    stats = {}
+    combinefrontend.combine_frontend_files(str(project), incremental_output, incremental=True, stats=stats, **options)
+    combinefrontend.combine_frontend_files(str(project), full_output, **options)
+
+    assert stats['files']['reused'] > 0
+    with open(incremental_output, 'rb') as f, open(full_output, 'rb') as g:
+        assert f.read() == g.read()
+
+def test_unchanged_run_leaves_output_untouched(tmp_path):
+    project = tmp_path / "project"
+    _make_project(project)
+    output = str(tmp_path / "out.txt")
+    combinefrontend.combine_frontend_files(str(project), output, incremental=True)
+    before = os.stat(output).st_mtime_ns
+    stats = {}
+    combinefrontend.combine_frontend_files(str(project), output, incremental=True, stats=stats)
+    assert stats['unchanged']
+    assert os.stat(output).st_mtime_ns == before
+
+def test_unreadable_file_does_not_force_rebuilds(tmp_path, capsys):
+    project = tmp_path / "project"
+    _make_project(project)
+    (project / "lib" / "latin1.txt").write_bytes(b"caf\xe9\n")
+    output = str(tmp_path / "out.txt")
+    combinefrontend.combine_frontend_files(str(project), output, incremental=True)
+    assert "Error reading" in capsys.readouterr().out
+    before = os.stat(output).st_mtime_ns
+    stats = {}
+    combinefrontend.combine_frontend_files(str(project), output, incremental=True, stats=stats)
+    assert stats['unchanged']
+    assert stats['files']['errors'] == 1
+    assert os.stat(output).st_mtime_ns == before
+    # Fixing the file is still picked up
+    (project / "lib" / "latin1.txt").write_text("café\n")
+    combinefrontend.combine_frontend_files(str(project), output, incremental=True, stats=stats)
+    assert not stats['unchanged']
+    with open(output, encoding='utf-8') as f:
+        assert "café" in f.read()
+
+@pytest.mark.parametrize("jobs", [2, 8])
+def test_parallel_matches_serial(tmp_path, jobs):
+    project = tmp_path / "project"
+    _make_project(project)
+    # Larger than SPOOL_MAX_SIZE, so it is spooled to disk, and not ASCII
+    _write(project, "lib/big.json", "[" + ",".join(f'"é{i}"' for i in range(200000)) + "]\n")
+    serial_output = str(tmp_path / "serial.txt")
+    parallel_output = str(tmp_path / "parallel.txt")
+    combinefrontend.combine_frontend_files(str(project), serial_output, jobs=1)
+    combinefrontend.combine_frontend_files(str(project), parallel_output, jobs=jobs)
+    with open(serial_output, 'rb') as f, open(parallel_output, 'rb') as g:
+        assert f.read() == g.read()
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import combinefrontend
+from combinefrontend import outline_dart
+
+@pytest.mark.parametrize("source, expected", [
+    # Dart block comments nest, and braces inside them are not structure
+    ("/* outer /* inner { */ still } */\nclass A {\n  int f() { return 1; }\n}\n",
+     "class A {\n  int f();\n}\n"),
+    ("const s = '}'; // } brace\nString t = \"{ not a block\";\nfinal r = r'${x}';\nvoid f() {}\n",
+     "const s = '}';\nString t = \"{ not a block\";\nfinal r = r'${x}';\nvoid f();\n"),
+    # Interpolations may hold braces, nested strings and quotes
+    ("String greet(String name) => 'Hi ${name.isEmpty ? '{}' : {name}}';\nfinal x = \"${a['}']}\";\nint y = 1;\n",
+     "String greet(String name);\nfinal x = \"${a['}']}\";\nint y = 1;\n"),
+    ("const doc = '''\n}\n{\n''';\nclass B {}\n",
+     "const doc = '''\n}\n{\n''';\nclass B {\n}\n"),
+    ("class C {\n  /// Doc for g.\n  int get g => _g;\n  bool operator ==(Object o) => identical(this, o);\n"
+     "  final m = {'a': 1};\n  C(this._g) : assert(_g > 0);\n  int _g;\n}\n",
+     "class C {\n  /// Doc for g.\n  int get g;\n  bool operator ==(Object o);\n"
+     "  final m = {...};\n  C(this._g) : assert(_g > 0);\n  int _g;\n}\n"),
+    ("import 'a.dart';\nmixin M on A {\n  void f() => print('=> {');\n}\nextension X on int {}\n",
+     "import 'a.dart';\nmixin M on A {\n  void f();\n}\nextension X on int {\n}\n"),
+    # mixin and extension are also valid member names
+    ("class F {\n  String get extension {\n    final i = name.lastIndexOf('.');\n    return name.substring(i);\n  }\n"
+     "  void mixin(int a) { var b = a; }\n  int extension2 = 0;\n}\n",
+     "class F {\n  String get extension;\n  void mixin(int a);\n  int extension2 = 0;\n}\n"),
+    ("@immutable\nabstract interface class G {}\n@foo.Bar()\nbase mixin H on G {}\n"
+     "extension type Id(int value) {\n  int get twice => value * 2;\n}\n",
+     "@immutable abstract interface class G {\n}\n@foo.Bar() base mixin H on G {\n}\n"
+     "extension type Id(int value) {\n  int get twice;\n}\n"),
+    ("", ""),
+])
+def test_outline(source, expected):
+    assert outline_dart(source) == expected
+
+@pytest.mark.parametrize("source, expected", [
+    ("class D extends E<int> {\n  final  int  a = - -1;\n  void f(int x) { }\n}\n",
+     "class D extends E<int> {\nfinal int a=- -1;\nvoid f(int x);\n}\n"),
+    ("bool operator ==(Object o) => true;\nvar s = 'a' 'b';\nint i = x++ + ++y;\n",
+     "bool operator==(Object o);\nvar s='a' 'b';\nint i=x+++ ++y;\n"),
+])
+def test_outline_minified(source, expected):
+    assert outline_dart(source, minify=True) == expected
+
+@pytest.mark.parametrize("source", [
+    "/* a /* b */ c */ x",
+    "'unterminated\nnext",
+    "\"${'${\"deep\"}'}\" + r'\\' + '''\n'''",
+    "/** doc */ /// line\n// plain",
+])
+def test_tokens_cover_source(source):
+    assert "".join(text for _, text in combinefrontend._dart_tokens(source)) == source
+
+def test_outline_cache_survives_incremental_runs(tmp_path):
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    for i in range(3):
+        (lib / f"a{i}.dart").write_text(f"class A{i} {{ int f() {{ return {i}; }} }}\n")
+    output = str(tmp_path / "out.txt")
+    cache_file = output + combinefrontend.OUTLINE_CACHE_SUFFIX
+
+    def entries():
+        with open(cache_file, encoding='utf-8') as f:
+            return json.load(f)['entries']
+
+    combinefrontend.combine_frontend_files(str(tmp_path), output, incremental=True, dart_mode='outline')
+    assert len(entries()) == 3
+    (lib / "a0.dart").write_text("class A0 { int g() => 0; }\n")
+    combinefrontend.combine_frontend_files(str(tmp_path), output, incremental=True, dart_mode='outline')
+    assert len(entries()) == 4
+    # A full run reads every file again and drops the stale entry
+    combinefrontend.combine_frontend_files(str(tmp_path), output, dart_mode='outline')
+    assert len(entries()) == 3
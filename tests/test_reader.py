@@ -0,0 +1,98 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import combinefrontend
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "combinefrontend.py")
+SOURCES = {
+    "pubspec.yaml": "name: app\n",
+    "lib/main.dart": "void main() {\n  runApp(const App());\n}\n",
+    "lib/l10n/en.json": '{"title": "A title long enough to be worth deduplicating"}\n',
+    "lib/l10n/en_GB.json": '{"title": "A title long enough to be worth deduplicating"}\n',
+    "lib/café.txt": "Non-ASCII content: éè\n",
+}
+
+@pytest.fixture
+def bundle(tmp_path):
+    project = tmp_path / "project"
+    for path, text in SOURCES.items():
+        (project / path).parent.mkdir(parents=True, exist_ok=True)
+        (project / path).write_text(text, encoding='utf-8')
+    (project / "assets").mkdir()
+    (project / "assets" / "logo.svg").write_text("<svg/>")
+    output = str(tmp_path / "out.txt")
+    combinefrontend.combine_frontend_files(str(project), output, index=True, dedupe=True)
+    return project, output
+
+def _run(output, *arguments):
+    return subprocess.run([sys.executable, SCRIPT, "-o", output, *arguments], capture_output=True)
+
+def test_read_returns_every_file(bundle):
+    _, output = bundle
+    with combinefrontend.BundleReader(output) as reader:
+        assert sorted(reader.paths()) == sorted(path.replace('/', os.sep) for path in SOURCES)
+        for path, text in SOURCES.items():
+            assert reader.read(path.replace('/', os.sep)) == text.encode('utf-8')
+            assert reader.verify(path.replace('/', os.sep))
+        assert reader.read_assets().endswith(b"logo.svg, Mime Type: image/svg+xml, Size: 6 bytes\n")
+        with pytest.raises(KeyError):
+            reader.read("missing.dart")
+
+def test_deduplicated_section_reads_first_copy(bundle):
+    _, output = bundle
+    with open(output, encoding='utf-8') as f:
+        assert f.read().count("A title long enough") == 1
+    with combinefrontend.BundleReader(output) as reader:
+        assert reader.read(os.path.join("lib", "l10n", "en.json")) == reader.read(os.path.join("lib", "l10n", "en_GB.json"))
+
+def test_index_of_another_bundle_is_rejected(bundle):
+    project, output = bundle
+    index_file = output + combinefrontend.INDEX_SUFFIX
+    stale_index = output + ".old"
+    shutil.copy(index_file, stale_index)
+    # One file grows by a byte and another shrinks by one, so the bundle size stays the same
+    size = os.path.getsize(output)
+    (project / "lib" / "main.dart").write_text(SOURCES["lib/main.dart"] + "x")
+    (project / "pubspec.yaml").write_text("name: ap\n")
+    combinefrontend.combine_frontend_files(str(project), output, dedupe=True)
+    assert os.path.getsize(output) == size
+    assert not os.path.exists(index_file)
+    with pytest.raises(ValueError):
+        combinefrontend.BundleReader(output, stale_index)
+    assert not combinefrontend._index_is_current(stale_index, output)
+
+def test_touched_bundle_is_rejected(bundle):
+    _, output = bundle
+    stat = os.stat(output)
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with pytest.raises(ValueError):
+        combinefrontend.BundleReader(output)
+
+def test_cli_list_and_extract(bundle):
+    _, output = bundle
+    listed = _run(output, "--list")
+    assert listed.returncode == 0
+    assert sorted(listed.stdout.decode('utf-8').splitlines()) == sorted(path.replace('/', os.sep) for path in SOURCES)
+    extracted = _run(output, "--extract", os.path.join("lib", "main.dart"), "--extract", "pubspec.yaml")
+    assert extracted.stdout == (SOURCES["lib/main.dart"] + SOURCES["pubspec.yaml"]).encode('utf-8')
+    missing = _run(output, "--extract", "nope.dart")
+    assert missing.returncode != 0 and b"Not in" in missing.stderr
+
+def test_cli_verify_reports_mismatch(bundle):
+    _, output = bundle
+    assert _run(output, "--verify").returncode == 0
+    # Corrupt one byte of lib/main.dart in place, keeping size and mtime so the index still applies
+    stat = os.stat(output)
+    with combinefrontend.BundleReader(output) as reader:
+        offset = reader._sections[os.path.join("lib", "main.dart")]['offset']
+    with open(output, 'r+b') as f:
+        f.seek(offset)
+        f.write(b"V")
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    verified = _run(output, "--verify")
+    assert verified.returncode == 1
+    assert verified.stdout.decode('utf-8').splitlines() == [f"Hash mismatch: {os.path.join('lib', 'main.dart')}"]
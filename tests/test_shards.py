@@ -0,0 +1,88 @@
+import json
+import os
+import re
+
+import combinefrontend
+from combinefrontend import estimate_tokens
+
+def _write(root, path, text):
+    filepath = root / path
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    filepath.write_text(text)
+
+def _shard(tmp_path, budget, **options):
+    output = str(tmp_path / "out.txt")
+    combinefrontend.combine_frontend_files(str(tmp_path / "project"), output, shard_tokens=budget, **options)
+    with open(output + combinefrontend.SHARDS_SUFFIX, encoding='utf-8') as f:
+        listing = json.load(f)
+    return output, listing['shards']
+
+def _paths(shard):
+    return [entry.get('path', 'ASSETS').replace(os.sep, '/') for entry in shard['files']]
+
+def test_priority_order(tmp_path):
+    project = tmp_path / "project"
+    for path in ("android/app/src/main/AndroidManifest.xml", "notes.txt", "test/widget_test.dart",
+                 "pubspec.yaml", "lib/main.dart", "analysis_options.yaml", "main.dart"):
+        _write(project, path, "content\n")
+    _, shards = _shard(tmp_path, 10000)
+    assert len(shards) == 1
+    assert _paths(shards[0]) == ["lib/main.dart", "pubspec.yaml", "test/widget_test.dart", "main.dart",
+                                 "analysis_options.yaml", "notes.txt", "android/app/src/main/AndroidManifest.xml", "ASSETS"]
+
+def test_first_fit_backfills_earlier_shards(tmp_path):
+    project = tmp_path / "project"
+    _write(project, "lib/a.dart", "x " * 60)
+    _write(project, "test/b.dart", "x " * 60)
+    _write(project, "c.txt", "x " * 10)
+    output, shards = _shard(tmp_path, 100)
+    assert [_paths(shard) for shard in shards] == [["lib/a.dart", "c.txt"], ["test/b.dart", "ASSETS"]]
+    for number, shard in enumerate(shards, 1):
+        with open(combinefrontend._shard_file(output, number), 'rb') as f:
+            data = f.read()
+        assert shard['tokens'] == sum(entry['tokens'] for entry in shard['files']) == estimate_tokens(data)
+        assert shard['tokens'] <= 100 and not shard['over_budget']
+
+def test_oversized_file_is_split_at_lines_in_order(tmp_path):
+    project = tmp_path / "project"
+    lines = [f"final value{i} = compute({i}, {i + 1});\n" for i in range(60)]
+    _write(project, "lib/big.dart", "".join(lines))
+    _write(project, "lib/small.dart", "x\n")
+    output, shards = _shard(tmp_path, 120)
+
+    parts = [(number, entry) for number, shard in enumerate(shards, 1) for entry in shard['files']
+             if entry.get('path', '').endswith('big.dart')]
+    assert len(parts) > 1
+    assert [entry['part'] for _, entry in parts] == [[n, len(parts)] for n in range(1, len(parts) + 1)]
+    assert [number for number, _ in parts] == sorted(number for number, _ in parts)
+
+    text = ""
+    for number in range(1, len(shards) + 1):
+        with open(combinefrontend._shard_file(output, number), encoding='utf-8') as f:
+            text += f.read()
+    bodies = re.split(r"\n\n--- FILE: (.*?) ---\n\n", text)
+    big = [body for path, body in zip(bodies[1::2], bodies[2::2]) if "big.dart (part" in path]
+    assert all(body.endswith("\n") for body in big)
+    assert "".join(big) == "".join(lines)
+    assert all(not shard['over_budget'] for shard in shards)
+
+def test_single_line_over_budget_is_flagged(tmp_path, capsys):
+    _write(tmp_path / "project", "lib/long.dart", "x " * 200 + "\n")
+    _, shards = _shard(tmp_path, 50)
+    assert shards[0]['over_budget']
+    assert "over the 50 token budget" in capsys.readouterr().out
+
+def test_leftover_shards_are_removed(tmp_path):
+    project = tmp_path / "project"
+    for i in range(6):
+        _write(project, f"lib/f{i}.dart", "x " * 40)
+    output, shards = _shard(tmp_path, 60)
+    assert len(shards) > 3
+    output, shards = _shard(tmp_path, 200)
+    assert all(os.path.exists(combinefrontend._shard_file(output, number)) for number in range(1, len(shards) + 1))
+    assert not os.path.exists(combinefrontend._shard_file(output, len(shards) + 1))
+
+    # A run without shard_tokens must not leave shards of an older bundle behind
+    combinefrontend.combine_frontend_files(str(project), output)
+    assert not os.path.exists(combinefrontend._shard_file(output, 1))
+    assert not os.path.exists(output + combinefrontend.SHARDS_SUFFIX)